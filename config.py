@@ -1,9 +1,13 @@
 import os
+import httpx
 from dotenv import load_dotenv
 from supabase import create_client, Client
 
-# Load environment variables
-load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '.env'))
+# Load environment variables (skip the disk parse if a parent process or an
+# earlier import already loaded them)
+if not os.environ.get('_DOTENV_LOADED'):
+    load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '.env'))
+    os.environ['_DOTENV_LOADED'] = '1'
 
 # Supabase configuration
 SUPABASE_URL = os.getenv("SUPABASE_URL")
@@ -12,6 +16,24 @@ SUPABASE_ANON_KEY = os.getenv("ANON_KEY")
 # Initialize Supabase client
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_ANON_KEY)
 
+# Swap the default PostgREST session for one with explicit pool limits,
+# keep-alive expiry and timeouts, so the several Supabase calls per cron run
+# reuse a single TLS connection and stale sockets don't spike tail latency
+try:
+    _default_session = supabase.postgrest.session
+    supabase.postgrest.session = httpx.Client(
+        base_url=_default_session.base_url,
+        headers=_default_session.headers,
+        limits=httpx.Limits(max_keepalive_connections=5, max_connections=10, keepalive_expiry=30),
+        timeout=httpx.Timeout(10.0, connect=3.0),
+        # Retry connect failures at the transport layer (no Python-level sleep);
+        # status-level retries stay with the tenacity wrapper in cron_job.py
+        transport=httpx.HTTPTransport(retries=3),
+    )
+except AttributeError:
+    # postgrest-py internals changed; keep the default client
+    pass
+
 # API Keys
 YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
@@ -19,6 +41,9 @@ CUSTOM_SEARCH_API_KEY = os.getenv("CUSTOM_SEARCH_API_KEY")
 CUSTOM_SEARCH_ENGINE_ID = os.getenv("CUSTOM_SEARCH_ENGINE_ID")
 
 # YouTube channel configuration
+# Optional: set YOUTUBE_CHANNEL_ID in .env to skip the handle->ID API lookup
+# entirely (the ID never changes for a given channel)
+YOUTUBE_CHANNEL_ID = os.getenv("YOUTUBE_CHANNEL_ID")
 CHANNEL_HANDLE = "@Trustified-Certification"
 CHANNEL_URL = "https://www.youtube.com/@Trustified-Certification"
 
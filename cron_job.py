@@ -1,116 +1,253 @@
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from functools import lru_cache
 from googleapiclient.discovery import build
+from googleapiclient.http import build_http
 import google.genai as genai
 from google.genai import types
-from datetime import datetime, timezone
+from tenacity import retry, stop_after_attempt, wait_exponential_jitter
+from datetime import datetime
 import config
+import json
+import logging
+from logging.handlers import MemoryHandler
+import orjson
+import re
+import sqlite3
+import threading
 import time
-import requests
+import httpx
 import os
-import time
 
-def retry_supabase_operation(operation_func, max_retries=3, delay=2):
+# Under cron/systemd stdout is a pipe, so every print() is its own write
+# syscall. Buffer log records in memory and flush them to stdout in batches
+# of 100 (errors flush immediately; logging.shutdown flushes the rest at exit)
+_log_target = logging.StreamHandler()
+_log_target.setFormatter(logging.Formatter('%(message)s'))
+_log_handler = MemoryHandler(capacity=100, flushLevel=logging.ERROR, target=_log_target)
+logger = logging.getLogger(__name__)
+logger.addHandler(_log_handler)
+logger.setLevel(os.environ.get('LOGLEVEL', 'INFO'))
+
+# Shared HTTP client so repeated HTTPS calls (Custom Search etc.) reuse
+# keep-alive connections instead of paying a TLS handshake per request;
+# googleapis.com speaks HTTP/2, so concurrent image lookups multiplex on a
+# single TLS connection instead of opening one socket each
+_http = httpx.Client(
+    http2=True,
+    timeout=httpx.Timeout(10.0, connect=3.0),
+    limits=httpx.Limits(max_keepalive_connections=16, max_connections=20, keepalive_expiry=30),
+    transport=httpx.HTTPTransport(retries=3),
+)
+
+# Reusable API clients - building these per call re-creates HTTP pools and
+# auth state for no benefit, so construct them once at import (same as the
+# Supabase client in config.py)
+_gemini_client = genai.Client(api_key=config.GEMINI_API_KEY)
+
+# Pace Gemini calls locally instead of paying for 429s and their retries:
+# at most 4 requests in flight and at most _GEMINI_RPM_LIMIT request starts
+# per sliding minute, across all worker threads
+_GEMINI_RPM_LIMIT = 10
+_gemini_sem = threading.BoundedSemaphore(4)
+_gemini_call_times = deque()
+_gemini_rpm_lock = threading.Lock()
+
+def _enforce_gemini_rpm():
+    """Block until starting another Gemini request stays under the RPM limit"""
+    while True:
+        with _gemini_rpm_lock:
+            now = time.monotonic()
+            while _gemini_call_times and now - _gemini_call_times[0] >= 60:
+                _gemini_call_times.popleft()
+            if len(_gemini_call_times) < _GEMINI_RPM_LIMIT:
+                _gemini_call_times.append(now)
+                return
+            wait_for = 60 - (now - _gemini_call_times[0])
+        logger.info(f"Gemini RPM limit reached, waiting {wait_for:.1f}s before next call")
+        time.sleep(wait_for)
+
+# Strips leading/trailing markdown code fences from Gemini output in one pass
+_FENCE_RE = re.compile(r'\A```(?:json)?\s*|\s*```\Z')
+
+# The analysis prompt is fully static: the video itself is passed to Gemini as
+# a separate Part, so no per-call string building is needed (and identical
+# prompt bytes give the API's implicit prompt caching a chance to hit)
+_PROMPT = """
+### SYSTEM ROLE ###
+You are a specialized JSON generator for laboratory analysis. You must perform a visual analysis of the provided video content. If you cannot access the video directly to see specific lab equipment, technician gear, and product texture, you must set "can_access_url": false.
+
+### INSTRUCTIONS ###
+1. Count how many different products are tested in the video
+2. For each product, analyze: lab results, company info, and quality tests
+3. Number each product starting from "1", "2", etc.
+
+### DATA RULES ###
+- You MUST output valid JSON matching the output template below, with each product's keys in exactly this order: "debug_info", "product_id", "product_info", "basic_tests", "contaminant_tests", "review".
+- For reference: basic_tests, review and contaminant_tests are parent tests, and the subtests are the tests inside them.
+- Product ID: [COMPANY][NAME][FLAVOR] (ALL CAPS, NO SPACES, NO SPECIAL CHARACTERS).
+- Categories: Whey Concentrate, Whey Isolate, Whey Blend, Plant protein, Creatine, Food, Omega 3, Others.
+- No ranges: Provide single average values.
+- Tests: Every parent test and every child test MUST have a "verdict" field(pass/fail/NULL). Only basic_tests subtests must also have "claimed" and "tested" fields; contaminant and review tests must not have a claimed field.
+- CRUCIAL FIELDS: Always include "company_name", "product_name", "product_category", "verdict" , "price" , "price_per_serving", "serving_size" in product_info.
+- PROTEIN/CREATINE: If product is whey/creatine, include "protein_per_serving"/"creatine_per_serving" in basic_tests.
+- Note: Every test must have a short note explaining the results of all the subtests; any descriptive matter MUST ONLY come under the "note" field.
+- NULL: If any field doesnt have the information then mark it "NULL".
+- Review: Must include "taste","mixability","packaging","serving_size_accuracy".
+- Price: If prices arent mentioned in the video then get the price of the products and include it.
+
+### OUTPUT TEMPLATE (STRICT ADHERENCE REQUIRED) ###
+{"1": {
+  "debug_info": { ... },
+  "product_id": "...",
+  "product_info": { ... },
+  "basic_tests": { ... },
+  "contaminant_tests": { ... },
+  "review": { ... }
+},
+"2": {...}
+}
+"""
+# Share one httplib2.Http so the sequential YouTube API calls ride the same
+# keep-alive connection instead of paying a TLS handshake per call;
+# static_discovery skips fetching the discovery document over the network
+_youtube = build('youtube', 'v3', developerKey=config.YOUTUBE_API_KEY, http=build_http(),
+                 static_discovery=True)
+
+def _log_supabase_retry(retry_state):
+    logger.info(f"Supabase operation failed (attempt {retry_state.attempt_number}): {retry_state.outcome.exception()}")
+    logger.info(f"Retrying in {retry_state.next_action.sleep:.1f} seconds...")
+
+_jittered_wait = wait_exponential_jitter(initial=0.5, max=8.0)
+
+def _supabase_retry_wait(retry_state):
     """
-    Retry Supabase operations with exponential backoff for network issues
+    Jittered exponential backoff, except when the server says exactly how long
+    to wait: a Retry-After header on a 429/503 response takes precedence
+    (capped, in case the server asks for minutes)
     """
-    for attempt in range(max_retries):
-        try:
-            return operation_func()
-        except Exception as e:
-            if attempt < max_retries - 1:
-                wait_time = delay * (2 ** attempt)  # Exponential backoff
-                print(f"Supabase operation failed (attempt {attempt + 1}/{max_retries}): {e}")
-                print(f"Retrying in {wait_time} seconds...")
-                time.sleep(wait_time)
-            else:
-                print(f"Supabase operation failed after {max_retries} attempts: {e}")
-                raise e
+    exc = retry_state.outcome.exception()
+    response = getattr(exc, 'response', None)
+    if response is not None and getattr(response, 'status_code', None) in (429, 503):
+        retry_after = response.headers.get('Retry-After', '')
+        if retry_after.isdigit():
+            return min(float(retry_after), 30.0)
+    return _jittered_wait(retry_state)
+
+@retry(stop=stop_after_attempt(3), wait=_supabase_retry_wait,
+       before_sleep=_log_supabase_retry, reraise=True)
+def retry_supabase_operation(operation_func):
+    """
+    Retry Supabase operations with jittered exponential backoff for network
+    issues (jitter keeps overlapping cron runs from retrying in lockstep)
+    """
+    return operation_func()
+
+# Daily Gemini usage counter, kept in SQLite so the increment is a single
+# atomic statement - concurrent video workers and overlapping cron runs can't
+# undercount the way the old read-then-rewrite text file could
+_usage_db = sqlite3.connect('gemini_usage.db', isolation_level=None, check_same_thread=False)
+_usage_db.execute('PRAGMA journal_mode=WAL')
+_usage_db.execute('CREATE TABLE IF NOT EXISTS usage (date TEXT PRIMARY KEY, n INTEGER NOT NULL)')
 
 def get_gemini_usage_count():
     """Get current Gemini API usage count for today"""
     try:
-        # Create usage file path
-        usage_file = 'gemini_usage.txt'
-
-        # Check if file exists and is from today
-        if os.path.exists(usage_file):
-            with open(usage_file, 'r') as f:
-                lines = f.readlines()
-                if len(lines) >= 2:
-                    date_str = lines[0].strip()
-                    count_str = lines[1].strip()
-
-                    # Check if it's today's date
-                    today = datetime.now().strftime('%Y-%m-%d')
-                    if date_str == today:
-                        return int(count_str)
-
-        # If file doesn't exist or is not from today, reset to 0
-        return 0
+        today = datetime.now().strftime('%Y-%m-%d')
+        row = _usage_db.execute('SELECT n FROM usage WHERE date = ?', (today,)).fetchone()
+        return row[0] if row else 0
     except Exception as e:
-        print(f"Error reading usage count: {e}")
+        logger.info(f"Error reading usage count: {e}")
         return 0
 
 def increment_gemini_usage_count():
-    """Increment and save Gemini API usage count"""
+    """Atomically increment and return today's Gemini API usage count"""
     try:
-        usage_file = 'gemini_usage.txt'
         today = datetime.now().strftime('%Y-%m-%d')
-        current_count = get_gemini_usage_count()
-        new_count = current_count + 1
-
-        # Write date and count
-        with open(usage_file, 'w') as f:
-            f.write(f"{today}\n{new_count}\n")
-
-        return new_count
+        row = _usage_db.execute(
+            'INSERT INTO usage VALUES (?, 1) '
+            'ON CONFLICT(date) DO UPDATE SET n = n + 1 '
+            'RETURNING n',
+            (today,)
+        ).fetchone()
+        return row[0]
     except Exception as e:
-        print(f"Error updating usage count: {e}")
+        logger.info(f"Error updating usage count: {e}")
         return 0
 
+# How many pending videos one cron tick may process. The whole pipeline is
+# I/O-bound, so the claimed batch runs concurrently; kept small so a single
+# tick can't burn through the daily Gemini quota
+MAX_VIDEOS_PER_RUN = 3
+
 def process_pending_video():
     """
-    Part 1: Process the newest pending video
-    - Get newest pending video
-    - Generate report with Gemini
-    - Fetch product image
-    - Update database
+    Part 1: Process pending videos (up to MAX_VIDEOS_PER_RUN per tick)
+    - Atomically claim pending videos
+    - Generate reports with Gemini and fetch product images
+    - Write reports and final status
     """
-    print("\n=== PROCESSING PENDING VIDEOS ===")
+    logger.info("\n=== PROCESSING PENDING VIDEOS ===")
 
+    # Claim videos one at a time - each claim_next_pending_video call is
+    # atomic (FOR UPDATE SKIP LOCKED), so overlapping cron runs stay safe
+    claimed = []
     try:
-        # Get newest pending video (sorted by published_at descending)
-        result = config.supabase.table('videos').select('*').eq('status', 'pending').order('published_at', desc=True).limit(1).execute()
-        
-        if not result.data or len(result.data) == 0:
-            print("No pending videos to process")
-            return
-        
-        video = result.data[0]
-        video_id = video['id']
-        video_url = video['video_url']
-        
-        print(f"Processing video: {video_url}")
-        
-        # Update status to 'updating'
-        def update_video_status():
-            return config.supabase.table('videos').update({
-            'status': 'updating',
-            'last_attempt_at': datetime.now(timezone.utc).isoformat(),
-            'retry_count': video.get('retry_count', 0) + 1
-        }).eq('id', video_id).execute()
-
-        retry_supabase_operation(update_video_status)
-        
+        for _ in range(MAX_VIDEOS_PER_RUN):
+            def claim_video():
+                return config.supabase.rpc('claim_next_pending_video').execute()
+
+            result = retry_supabase_operation(claim_video)
+
+            if not result.data or len(result.data) == 0:
+                break
+            claimed.append(result.data[0])
+    except Exception as e:
+        logger.info(f"Error claiming pending videos: {e}")
+
+    if not claimed:
+        logger.info("No pending videos to process")
+        return
+
+    # Process the claimed batch concurrently - each video is independent and
+    # spends nearly all its time waiting on Gemini/Custom Search/Supabase
+    if len(claimed) == 1:
+        _process_claimed_video(claimed[0])
+    else:
+        with ThreadPoolExecutor(max_workers=len(claimed)) as executor:
+            list(executor.map(_process_claimed_video, claimed))
+
+def _process_claimed_video(video):
+    """
+    Process one already-claimed video: generate reports, fetch images,
+    finalize. Marks the video 'failed' on any error.
+    """
+    video_id = video['id']
+    video_url = video['video_url']
+
+    try:
+        logger.info(f"Processing video: {video_url}")
+
         # Generate reports with Gemini (returns array of reports)
-        print("Generating reports with Gemini...")
+        logger.info("Generating reports with Gemini...")
         reports_array = generate_report_with_gemini(video_url)
 
         if not reports_array or len(reports_array) == 0:
             raise Exception("Failed to generate reports")
 
-        print(f"Generated {len(reports_array)} product report(s)")
+        logger.info(f"Generated {len(reports_array)} product report(s)")
+
+        # Fetch all product images concurrently - the Custom Search calls are
+        # independent, so wall time is the slowest single call instead of the sum.
+        # Pool is bounded to avoid tripping Custom Search QPS limits.
+        logger.info(f"Fetching product images for {len(reports_array)} report(s)...")
+        with ThreadPoolExecutor(max_workers=min(8, len(reports_array))) as executor:
+            image_urls = list(executor.map(fetch_product_image, reports_array))
 
-        # Insert each report into reports table as separate rows
+        # Build one row per product with the image already resolved so the final
+        # image_url/image_status go out in the same insert (one bulk upsert
+        # instead of insert + update per product)
+        report_rows = []
         for i, report_json in enumerate(reports_array):
                 # Extract data from Gemini results for database fields
                 product_id_value = report_json.get('product_id', '')
@@ -144,20 +281,19 @@ def process_pending_video():
                 if not verdict_value:
                     verdict_value = 'fail'  # Default to fail
                     if basic_tests:
-                        # Check if any test has a result field
-                        test_results = []
+                        # Scan results directly: one failed test decides the
+                        # verdict, so stop there instead of collecting them all
+                        has_results = False
+                        any_failed = False
                         for test_key, test_data in basic_tests.items():
                             if isinstance(test_data, dict) and 'result' in test_data:
-                                result = test_data['result'].strip().lower()
-                                test_results.append(result)
-
-                        # If we have test results, determine overall verdict
-                        if test_results:
-                            # If all results are "passed", then overall verdict is "pass"
-                            if all(result == 'passed' for result in test_results):
-                                verdict_value = 'pass'
-                            else:
-                                verdict_value = 'fail'
+                                has_results = True
+                                if test_data['result'].strip().lower() != 'passed':
+                                    any_failed = True
+                                    break
+
+                        if has_results:
+                            verdict_value = 'fail' if any_failed else 'pass'
                         else:
                             # Fallback: check for top-level verdict field in basic_tests
                             verdict_value = basic_tests.get('verdict', 'fail').strip().lower()
@@ -171,80 +307,55 @@ def process_pending_video():
                 # Generate unique report ID (video_id + product_index to ensure uniqueness)
                 report_id = f"{video_id}_{i}"
 
-                print(f"Storing report {i+1}/{len(reports_array)}: {product_id_value or report_id}")
-
-                try:
-                    # Insert report with all required fields per updated schema
-                    def insert_report():
-                        insert_data = {
-                            'id': report_id,  # Unique report ID (video_id + index)
-                            'results': report_json,
-                            'image_status': 'pending',
-                            'video_url': video_url,
-                            'product_id': product_id_value,  # Text field (was bigint)
-                            'product_name': product_name,
-                            'product_category': product_category,
-                            'verdict': verdict_value,  # Now allows: pass, fail, not assigned, pending
-                            'company': company_name,
-                            'video_id': video_id  # Foreign key to videos table
-                        }
-                        # Add price if available (convert to int for database)
-                        if price_value is not None:
-                            insert_data['price'] = int(price_value)
-                        return config.supabase.table('reports').insert(insert_data).execute()
-
-                    result = retry_supabase_operation(insert_report)
-                    inserted_report_id = report_id
-
-                except Exception as insert_error:
-                    print(f"Error inserting report {i+1}: {insert_error}")
-                    continue
-
-                # Fetch product image for this specific report
-                print(f"Fetching product image for {product_id_value or product_name}...")
-                image_url = fetch_product_image(report_json)
-
-                # Update report with image
-                try:
-                    if image_url:
-                        def update_image_success():
-                            return config.supabase.table('reports').update({
-                                'image_url': image_url,
-                                'image_status': 'completed'
-                            }).eq('id', inserted_report_id).execute()
-                        retry_supabase_operation(update_image_success)
-                        print(f"Image stored for {product_id_value or product_name}: {image_url}")
-                    else:
-                        def update_image_failed():
-                            return config.supabase.table('reports').update({
-                                'image_status': 'failed'
-                            }).eq('id', inserted_report_id).execute()
-                        retry_supabase_operation(update_image_failed)
-                        print(f"Failed to fetch product image for {product_id_value or product_name}")
-                except Exception as update_error:
-                    print(f"Error updating image status for {product_id_value or product_name}: {update_error}")
-        
-        # Update video status to 'completed'
-        def update_video_completed():
-            return config.supabase.table('videos').update({
-            'status': 'completed'
-        }).eq('id', video_id).execute()
-        
-        retry_supabase_operation(update_video_completed)
-        print(f"Successfully processed video: {video_url}")
+                image_url = image_urls[i]
+                if image_url:
+                    logger.info(f"Image found for {product_id_value or product_name}: {image_url}")
+                else:
+                    logger.info(f"Failed to fetch product image for {product_id_value or product_name}")
+
+                row = {
+                    'id': report_id,  # Unique report ID (video_id + index)
+                    'results': report_json,
+                    'image_url': image_url,
+                    'image_status': 'completed' if image_url else 'failed',
+                    'video_url': video_url,
+                    'product_id': product_id_value,  # Text field (was bigint)
+                    'product_name': product_name,
+                    'product_category': product_category,
+                    'verdict': verdict_value,  # Now allows: pass, fail, not assigned, pending
+                    'company': company_name,
+                    'video_id': video_id  # Foreign key to videos table
+                }
+                # Add price if available (convert to int for database)
+                if price_value is not None:
+                    row['price'] = int(price_value)
+                report_rows.append(row)
+
+        # Write all reports and flip the video to 'completed' in one
+        # transactional RPC (see supabase_functions.sql)
+        logger.info(f"Storing {len(report_rows)} report(s) and finalizing video...")
+
+        def finalize_video():
+            return config.supabase.rpc('finalize_video', {
+                'p_video_id': video_id,
+                'p_rows': report_rows
+            }).execute()
+
+        retry_supabase_operation(finalize_video)
+        logger.info(f"Successfully processed video: {video_url}")
         
     except Exception as e:
-        print(f"Error processing video: {e}")
+        logger.info(f"Error processing video: {e}")
         try:
             # Update video status to 'failed'
-            if 'video_id' in locals():
-                def update_video_failed():
-                    return config.supabase.table('videos').update({
-                    'status': 'failed'
-                }).eq('id', video_id).execute()
-                retry_supabase_operation(update_video_failed)
+            def update_video_failed():
+                # returning='minimal' skips serializing the updated row we never read
+                return config.supabase.table('videos').update({
+                'status': 'failed'
+            }, returning='minimal').eq('id', video_id).execute()
+            retry_supabase_operation(update_video_failed)
         except Exception as failure_error:
-            print(f"Failed to update video status to failed: {failure_error}")
+            logger.info(f"Failed to update video status to failed: {failure_error}")
 
 def generate_report_with_gemini(video_url):
     """
@@ -252,94 +363,29 @@ def generate_report_with_gemini(video_url):
     Uses native YouTube URL support with FileData to make Gemini actually "see" the video
     """
     try:
-        print(f"Initializing Gemini client for video: {video_url}")
-        client = genai.Client(api_key=config.GEMINI_API_KEY)
-
-        # Debug: List available models
-        print("Listing available models...")
-        try:
-            models = client.models.list()
-            print("Available models:")
-            for model in models:
-                print(f"  - {model.name}")
-        except Exception as list_error:
-            print(f"Failed to list models: {list_error}")
-
-        # Create the analysis prompt that forces video content analysis
-        prompt = """
-### SYSTEM ROLE ###
-You are a specialized JSON generator for laboratory analysis. You must perform a visual analysis of the provided video content. If you cannot access the video directly to see specific lab equipment, technician gear, and product texture, you must set "can_access_url": false.
-
-### INSTRUCTIONS ###
-1. Count how many different products are tested in the video
-2. For each product, analyze: lab results, company info, and quality tests
-3. Number each product starting from "1", "2", etc.
-
-### JSON STRUCTURE AND STRICT ORDERING ###
-You MUST output valid JSON. The keys MUST appear in this exact order:
-1. "debug_info"
-2. "product_id"
-3. "product_info"
-4. "basic_tests"
-5. "contaminant_tests"
-6. "review"
-
-### DATA RULES ###
-- For reference: basic_tests, review and contaminant_tests are parent tests, and the subtests are the tests inside them.
-- Product ID: [COMPANY][NAME][FLAVOR] (ALL CAPS, NO SPACES, NO SPECIAL CHARACTERS).
-- Categories: Whey Concentrate, Whey Isolate, Whey Blend, Plant protein, Creatine, Food, Omega 3, Others.
-- No ranges: Provide single average values.
-- Tests: Parent tests and sub tests both must include "verdict", "claimed", and "tested".
-- CRUCIAL FIELDS: Always include "company_name", "product_name", "product_category", "verdict" , "price" , "price_per_serving", "serving_size" in product_info.
-- PROTEIN/CREATINE: If product is whey/creatine, include "protein_per_serving"/"creatine_per_serving" in basic_tests.
-- Note: Every test must have a short note explaining the results of all the subtests.
-- parent tests: Every parent test MUST have a "verdict" field(pass/fail/NULL).
-- children tests: Every child test MUST have a "verdict" field(pass/fail/NULL).
-- NULL: If any field doesnt have the information then mark it "NULL".
-- Claimed: Only basic_tests subtests must have claimed field. Contaminant and review tests must not have claimed field.
-- Review: Must include "taste","mixability","packaging","serving_size_accuracy". 
-- Price: If prices arent mentioned in the video then get the price of the products and include it.
-- Rule: Any descriptive matter MUST ONLY come under "note" field. 
-
-### INPUT VIDEO ###
-""" + video_url + """
-
-### OUTPUT TEMPLATE (STRICT ADHERENCE REQUIRED) ###
-{"1": {
-  "debug_info": { ... },
-  "product_id": "...",
-  "product_info": { ... },
-  "basic_tests": { ... },
-  "contaminant_tests": { ... },
-  "review": { ... }
-},
-"2": {...}
-}
-
-        """
-
-        from google.genai import types
+        logger.info(f"Generating report for video: {video_url}")
+        client = _gemini_client
 
         # 1. Create Part object for native YouTube video processing
-        print(f"Creating Part object for YouTube URL: {video_url}")
+        logger.debug("Creating Part object for YouTube URL: %s", video_url)
         video_part = types.Part.from_uri(
             file_uri=video_url,
             mime_type='video/mp4'
         )
-        print(f"Part created successfully: {video_part}")
+        logger.debug("Part created successfully")
 
         # 2. Define the config using the proper class
+        # response_mime_type forces clean JSON output (no markdown fences, far
+        # fewer parse failures). Note: JSON mode cannot be combined with the
+        # google_search tool, so grounding is dropped in favour of guaranteed
+        # structured output.
         gemini_config = types.GenerateContentConfig(
             temperature=0.1,
-            tools=[
-                types.Tool(
-                    google_search=types.GoogleSearch()
-                )
-            ]
+            response_mime_type='application/json'
         )
 
         # 3. Call the model with Part object and prompt
-        print("Sending request to Gemini API with video Part...")
+        logger.debug("Sending request to Gemini API with video Part...")
 
         # Track Gemini usage
         usage_count = increment_gemini_usage_count()
@@ -348,92 +394,86 @@ You MUST output valid JSON. The keys MUST appear in this exact order:
             emoji = "⚠️"
         elif usage_count >= 15:
             emoji = "🟡"
-        print(f"{emoji} GEMINI API CALL #{usage_count}/20 {emoji}")
+        logger.info(f"{emoji} GEMINI API CALL #{usage_count}/20 {emoji}")
 
         if usage_count >= 20:
-            print("⚠️ WARNING: You have reached your Gemini API quota limit! ⚠️")
+            logger.info("⚠️ WARNING: You have reached your Gemini API quota limit! ⚠️")
 
         try:
-            response = client.models.generate_content(
-                model='gemini-2.5-flash',
-                contents=[video_part, prompt],  # Pass video Part AND prompt
-                config=gemini_config
-            )
-            print("Gemini API call successful")
+            # Take a concurrency permit and respect the local RPM window so a
+            # burst of workers never trips the server-side rate limiter
+            with _gemini_sem:
+                _enforce_gemini_rpm()
+                response = client.models.generate_content(
+                    model='gemini-2.5-flash',
+                    contents=[video_part, _PROMPT],  # Pass video Part AND prompt
+                    config=gemini_config
+                )
+            logger.info("Gemini API call successful")
         except Exception as api_error:
-            print(f"Gemini API call failed: {api_error}")
-            print(f"API Error type: {type(api_error).__name__}")
+            logger.info(f"Gemini API call failed: {api_error}")
+            logger.info(f"API Error type: {type(api_error).__name__}")
             return None
 
-        print("Received response from Gemini, parsing...")
+        logger.debug("Received response from Gemini, parsing...")
 
         # Parse JSON from response
-        import json
         try:
-            print(f"Response object type: {type(response)}")
-            print(f"Response object attributes: {dir(response) if response else 'None'}")
+            logger.debug("Response object type: %s", type(response))
 
             # Try different response structures
             if response and hasattr(response, 'text') and response.text:
                 response_text = response.text.strip()
-                print(f"Response text length: {len(response_text)}")
-                print(f"Response text preview: {response_text[:200]}...")
+                logger.debug("Response text length: %d", len(response_text))
+                logger.debug("Response text preview: %s...", response_text[:200])
             elif response and hasattr(response, 'candidates') and response.candidates and len(response.candidates) > 0:
                 candidate = response.candidates[0]
-                print(f"First candidate: {candidate}")
+                logger.debug("First candidate: %s", candidate)
                 if hasattr(candidate, 'content') and hasattr(candidate.content, 'parts') and len(candidate.content.parts) > 0:
                     response_text = candidate.content.parts[0].text.strip()
-                    print(f"Response from candidates length: {len(response_text)}")
-                    print(f"Response text preview: {response_text[:200]}...")
+                    logger.debug("Response from candidates length: %d", len(response_text))
+                    logger.debug("Response text preview: %s...", response_text[:200])
                 else:
-                    print("No valid parts found in candidate")
+                    logger.info("No valid parts found in candidate")
                     return None
             else:
-                print(f"Response object: {response}")
+                logger.debug("Response object: %s", response)
                 response_text = str(response).strip() if response else ""
-                print(f"Response as string length: {len(response_text)}")
+                logger.debug("Response as string length: %d", len(response_text))
                 if not response_text:
-                    print("Empty response received")
+                    logger.info("Empty response received")
                     return None
         except Exception as e:
-            print(f"Error parsing response: {e}")
-            import traceback
-            print(f"Traceback: {traceback.format_exc()}")
+            logger.info(f"Error parsing response: {e}")
             return None
 
         # Remove markdown code blocks if present
-        if response_text.startswith('```json'):
-            response_text = response_text[7:]
-        if response_text.startswith('```'):
-            response_text = response_text[3:]
-        if response_text.endswith('```'):
-            response_text = response_text[:-3]
-
-        response_text = response_text.strip()
+        response_text = _FENCE_RE.sub('', response_text).strip()
 
         # Parse JSON response - handle both single and multiple products
         try:
-            print("Attempting to parse JSON response...")
+            logger.debug("Attempting to parse JSON response...")
 
             # First try to parse the entire response as one JSON object/array
             try:
-                reports_array = json.loads(response_text)
-                print(f"Successfully parsed JSON. Type: {type(reports_array)}")
+                reports_array = orjson.loads(response_text)
+                logger.debug("Successfully parsed JSON. Type: %s", type(reports_array))
 
-                # Debug: Print the actual response structure
+                # Debug: log the actual response structure (lazy %s args, so the
+                # keys list is only built when DEBUG logging is enabled)
                 if isinstance(reports_array, dict):
-                    print("DEBUG: Single report keys:", list(reports_array.keys()))
+                    logger.debug("Single report keys: %s", list(reports_array.keys()))
                     if 'debug_info' in reports_array:
-                        print("DEBUG: debug_info found:", reports_array['debug_info'])
+                        logger.debug("debug_info found: %s", reports_array['debug_info'])
                     else:
-                        print("DEBUG: No debug_info field found in response")
-                    print("DEBUG: product_id:", reports_array.get('product_id', 'NOT FOUND'))
+                        logger.debug("No debug_info field found in response")
+                    logger.debug("product_id: %s", reports_array.get('product_id', 'NOT FOUND'))
                 elif isinstance(reports_array, list) and len(reports_array) > 0:
-                    print("DEBUG: First report keys:", list(reports_array[0].keys()))
+                    logger.debug("First report keys: %s", list(reports_array[0].keys()))
                     if 'debug_info' in reports_array[0]:
-                        print("DEBUG: debug_info found:", reports_array[0]['debug_info'])
+                        logger.debug("debug_info found: %s", reports_array[0]['debug_info'])
                     else:
-                        print("DEBUG: No debug_info field found in response")
+                        logger.debug("No debug_info field found in response")
 
                 # If it's a single object, check if it contains numbered products
                 if isinstance(reports_array, dict):
@@ -444,7 +484,7 @@ You MUST output valid JSON. The keys MUST appear in this exact order:
                         products_array = []
                         for key in sorted(product_keys, key=int):  # Sort numerically
                             products_array.append(reports_array[key])
-                        print(f"Extracted {len(products_array)} products from numbered keys: {product_keys}")
+                        logger.info(f"Extracted {len(products_array)} products from numbered keys: {product_keys}")
                         return products_array
                     elif 'products' in reports_array and isinstance(reports_array['products'], dict):
                         # Alternative structure: products object with numbered keys
@@ -452,80 +492,147 @@ You MUST output valid JSON. The keys MUST appear in this exact order:
                         products_array = []
                         for key in sorted(products_obj.keys()):  # Sort by key to maintain order
                             products_array.append(products_obj[key])
-                        print(f"Extracted {len(products_array)} products from products object")
+                        logger.info(f"Extracted {len(products_array)} products from products object")
                         return products_array
                     else:
                         # Old single product structure
-                        print("Returning single report as array")
+                        logger.info("Returning single report as array")
                         return [reports_array]
                 # If it's already an array, return as is
                 elif isinstance(reports_array, list):
-                    print(f"Returning {len(reports_array)} reports")
+                    logger.info(f"Returning {len(reports_array)} reports")
                     return reports_array
 
-            except json.JSONDecodeError as single_parse_error:
+            except orjson.JSONDecodeError as single_parse_error:
                 # If single parse fails, try to split and parse multiple JSON objects
-                print(f"Single JSON parse failed: {single_parse_error}")
-                print("Attempting to parse as multiple JSON objects...")
+                logger.info(f"Single JSON parse failed: {single_parse_error}")
+                logger.info("Attempting to parse as multiple JSON objects...")
 
-                # Split response into individual JSON objects
-                # Look for pattern: } followed by { (end of one object, start of next)
+                # Walk the text with raw_decode, which parses one object and
+                # reports where it ended - the C decoder handles braces inside
+                # strings and escapes, and we skip the old char-by-char scan
                 json_objects = []
                 current_pos = 0
+                decoder = json.JSONDecoder()
 
-                while current_pos < len(response_text):
-                    # Find the start of a JSON object
+                while True:
+                    # Find the start of the next JSON object
                     start_pos = response_text.find('{', current_pos)
                     if start_pos == -1:
                         break
 
-                    # Find the matching closing brace
-                    brace_count = 0
-                    end_pos = start_pos
-                    for i in range(start_pos, len(response_text)):
-                        if response_text[i] == '{':
-                            brace_count += 1
-                        elif response_text[i] == '}':
-                            brace_count -= 1
-                            if brace_count == 0:
-                                end_pos = i + 1
-                                break
-
-                    if brace_count != 0:
-                        break  # Malformed JSON
-
-                    # Extract and parse this JSON object
-                    json_str = response_text[start_pos:end_pos].strip()
-                    if json_str:
-                        try:
-                            parsed_obj = json.loads(json_str)
-                            json_objects.append(parsed_obj)
-                            print(f"Successfully parsed JSON object {len(json_objects)}")
-                        except json.JSONDecodeError as obj_error:
-                            print(f"Failed to parse JSON object at position {start_pos}: {obj_error}")
-                            break
+                    try:
+                        parsed_obj, end_pos = decoder.raw_decode(response_text, start_pos)
+                        json_objects.append(parsed_obj)
+                        logger.debug("Successfully parsed JSON object %d", len(json_objects))
+                    except json.JSONDecodeError as obj_error:
+                        logger.info(f"Failed to parse JSON object at position {start_pos}: {obj_error}")
+                        break
 
                     current_pos = end_pos
 
                 if json_objects:
-                    print(f"Successfully parsed {len(json_objects)} JSON objects")
+                    logger.info(f"Successfully parsed {len(json_objects)} JSON objects")
                     return json_objects
                 else:
-                    print("Failed to parse any valid JSON objects")
+                    logger.info("Failed to parse any valid JSON objects")
                     return None
 
         except Exception as e:
-            print(f"Unexpected error during JSON parsing: {e}")
-            print(f"Response text (first 500 chars): {response_text[:500]}...")
+            logger.info(f"Unexpected error during JSON parsing: {e}")
+            logger.info(f"Response text (first 500 chars): {response_text[:500]}...")
             return None
 
     except Exception as e:
-        print(f"Error generating report with Gemini: {e}")
-        print(f"Error type: {type(e).__name__}")
-        import traceback
-        print(f"Traceback: {traceback.format_exc()}")
+        logger.info(f"Error generating report with Gemini: {e}")
+        logger.info(f"Error type: {type(e).__name__}")
+        return None
+
+@lru_cache(maxsize=512)
+def _search_image(query):
+    """
+    Run one Google Custom Search image query and return the first non-social-media
+    image URL, or None. Results are memoized per normalized query so repeated
+    products don't burn extra billed Custom Search calls.
+    """
+    # Make Custom Search API request (get more results to filter social media)
+    url = "https://www.googleapis.com/customsearch/v1"
+    params = {
+        'key': config.CUSTOM_SEARCH_API_KEY,
+        'cx': config.CUSTOM_SEARCH_ENGINE_ID,
+        'q': query,
+        'searchType': 'image',
+        'num': 10  # Get 10 results to have alternatives after filtering
+    }
+
+    logger.debug("🔍 Image search query: '%s'", query)
+
+    response = _http.get(url, params=params)
+    logger.debug("🌐 Custom Search API response status: %s", response.status_code)
+
+    if response.status_code == 400:
+        logger.info(f"❌ Bad Request details: {response.text}")
+        logger.info("This usually means invalid API key or search engine ID")
+        logger.info("SOLUTION: Go to Google Cloud Console and check/renew your API keys")
+        return None
+    elif response.status_code == 403:
+        logger.info(f"🚫 Forbidden - likely API key expired or quota exceeded: {response.text}")
+        logger.info("SOLUTION: Check API key validity and billing status in Google Cloud Console")
         return None
 
+    response.raise_for_status()
+
+    data = response.json()
+
+    # Debug: log response structure (only formatted when DEBUG is enabled)
+    logger.debug("📋 API Response keys: %s", list(data.keys()) if data else 'None')
+    if 'items' in data:
+        logger.debug("🖼️  Total image results returned: %d", len(data['items']))
+    else:
+        logger.debug("⚠️  No 'items' key in response")
+
+    # Debug: log first few results if available
+    if logger.isEnabledFor(logging.DEBUG) and 'items' in data and len(data['items']) > 0:
+        logger.debug("🔍 First 3 raw results:")
+        for i, item in enumerate(data['items'][:3]):
+            title = item.get('title', 'N/A')
+            link = item.get('link', 'N/A')
+            logger.debug("   %d. Title: '%s...' | URL: %s...", i + 1, title[:50], link[:60])
+
+    # Filter out social media images (Facebook, Instagram, YouTube, etc.)
+    social_domains = [
+        'facebook.com', 'instagram.com', 'fbcdn.net', 'instagram.net',
+        'facebook.net', 'fb.com', 'tiktok.com', 'twitter.com', 'x.com',
+        'youtube.com', 'youtu.be', 'googlevideo.com', 'ytimg.com'
+    ]
+
+    social_count = 0
+
+    if 'items' in data and len(data['items']) > 0:
+        for item in data['items']:
+            image_url = item.get('link', '')
+            if image_url:
+                # Check if URL contains social media domains
+                is_social_media = any(domain in image_url.lower() for domain in social_domains)
+                if not is_social_media:
+                    logger.debug("✅ Selected filtered image: %s", image_url)
+                    return image_url
+                else:
+                    social_count += 1
+                    logger.debug("🚫 Skipped social media image: %s", image_url)
+
+        logger.info(f"⚠️  All {len(data['items'])} image results were from social media platforms ({social_count} skipped)")
+    else:
+        logger.info(f"❌ No image results found for query '{query}'")
+        # Debug: log the full response if it's small
+        if logger.isEnabledFor(logging.DEBUG):
+            if data and len(str(data)) < 1000:
+                logger.debug("🔍 Full API response: %s", data)
+            else:
+                logger.debug("🔍 Response too large to display")
+
+    return None
+
 def fetch_product_image(report_json):
     """
     Use Google Custom Search API to find product image
@@ -534,6 +641,14 @@ def fetch_product_image(report_json):
     try:
         # Extract product details for search query
         product_info = report_json.get('product_info', {})
+
+        # Short-circuit: if the report already carries a usable product image
+        # URL, skip the billed (and quota-limited) Custom Search call entirely
+        existing_image = product_info.get('image_url') or product_info.get('image')
+        if isinstance(existing_image, str) and existing_image.startswith('http'):
+            logger.info(f"✅ Using image URL from report: {existing_image}")
+            return existing_image
+
         company_name = product_info.get('company_name', '').strip()
         product_name = product_info.get('product_name', '').strip()
 
@@ -573,7 +688,7 @@ def fetch_product_image(report_json):
             search_query = product_name
 
         if not search_query:
-            print("❌ No product name found in report")
+            logger.info("❌ No product name found in report")
             return None
 
         # Clean up search query - remove concatenated words that might be IDs
@@ -608,12 +723,12 @@ def fetch_product_image(report_json):
                 if len(words) > 1:
                     readable_query = ' '.join(words)
                     alternative_queries.append(readable_query)
-                    print(f"💡 Detected concatenated text, trying readable version: '{readable_query}'")
+                    logger.debug("💡 Detected concatenated text, trying readable version: '%s'", readable_query)
 
             # Use first alternative if available
             if alternative_queries:
                 search_query = alternative_queries[0]
-                print(f"🔄 Using alternative search query: '{search_query}'")
+                logger.debug("🔄 Using alternative search query: '%s'", search_query)
 
         # Try multiple search queries if the first one fails
         search_queries_to_try = [search_query]
@@ -629,99 +744,25 @@ def fetch_product_image(report_json):
         # Remove duplicates while preserving order
         search_queries_to_try = list(dict.fromkeys(search_queries_to_try))
 
-        print(f"🎯 Will try {len(search_queries_to_try)} search queries: {search_queries_to_try}")
+        logger.debug("🎯 Will try %d search queries: %s", len(search_queries_to_try), search_queries_to_try)
 
-        # Try each search query until we find an image
+        logger.debug("📊 Product info: company='%s', product='%s', flavor='%s'", company_name, product_name, flavor)
+
+        # Try each search query until we find an image (results are cached per query)
         for attempt, current_query in enumerate(search_queries_to_try, 1):
             if attempt > 1:
-                print(f"🔄 Trying fallback query {attempt}/{len(search_queries_to_try)}: '{current_query}'")
-
-            # Make Custom Search API request (get more results to filter social media)
-            url = "https://www.googleapis.com/customsearch/v1"
-            params = {
-                'key': config.CUSTOM_SEARCH_API_KEY,
-                'cx': config.CUSTOM_SEARCH_ENGINE_ID,
-                'q': current_query,
-                'searchType': 'image',
-                'num': 10  # Get 10 results to have alternatives after filtering
-            }
-
-            print(f"🔍 Image search query: '{current_query}'")
-            print(f"📊 Product info: company='{company_name}', product='{product_name}', flavor='{flavor}'")
-
-            response = requests.get(url, params=params)
-            print(f"🌐 Custom Search API response status: {response.status_code}")
-
-            if response.status_code == 400:
-                print(f"❌ Bad Request details: {response.text}")
-                print("This usually means invalid API key or search engine ID")
-                print("SOLUTION: Go to Google Cloud Console and check/renew your API keys")
-                continue  # Try next query
-            elif response.status_code == 403:
-                print(f"🚫 Forbidden - likely API key expired or quota exceeded: {response.text}")
-                print("SOLUTION: Check API key validity and billing status in Google Cloud Console")
-                continue  # Try next query
-
-            response.raise_for_status()
-
-            data = response.json()
-
-            # Debug: Print response structure
-            print(f"📋 API Response keys: {list(data.keys()) if data else 'None'}")
-            if 'items' in data:
-                print(f"🖼️  Total image results returned: {len(data['items'])}")
-            else:
-                print("⚠️  No 'items' key in response")
-
-            # Debug: Print first few results if available
-            if 'items' in data and len(data['items']) > 0:
-                print("🔍 First 3 raw results:")
-                for i, item in enumerate(data['items'][:3]):
-                    title = item.get('title', 'N/A')
-                    link = item.get('link', 'N/A')
-                    print(f"   {i+1}. Title: '{title[:50]}...' | URL: {link[:60]}...")
-
-            # Filter out social media images (Facebook, Instagram, YouTube, etc.)
-            social_domains = [
-                'facebook.com', 'instagram.com', 'fbcdn.net', 'instagram.net',
-                'facebook.net', 'fb.com', 'tiktok.com', 'twitter.com', 'x.com',
-                'youtube.com', 'youtu.be', 'googlevideo.com', 'ytimg.com'
-            ]
-
-            filtered_count = 0
-            social_count = 0
-
-            if 'items' in data and len(data['items']) > 0:
-                for item in data['items']:
-                    image_url = item.get('link', '')
-                    if image_url:
-                        # Check if URL contains social media domains
-                        is_social_media = any(domain in image_url.lower() for domain in social_domains)
-                        if not is_social_media:
-                            print(f"✅ Selected filtered image: {image_url}")
-                            return image_url
-                        else:
-                            social_count += 1
-                            print(f"🚫 Skipped social media image: {image_url}")
+                logger.debug("🔄 Trying fallback query %d/%d: '%s'", attempt, len(search_queries_to_try), current_query)
 
-                print(f"📊 Filtering summary: {len(data['items'])} total, {social_count} social media, {filtered_count} valid")
-                print(f"⚠️  All {len(data['items'])} image results were from social media platforms")
-                # Continue to next query instead of returning None immediately
-            else:
-                print(f"❌ No image results found for query '{current_query}'")
-                # Debug: Print the full response if it's small
-                if data and len(str(data)) < 1000:
-                    print(f"🔍 Full API response: {data}")
-                else:
-                    print("🔍 Response too large to display")
-                # Continue to next query
+            image_url = _search_image(' '.join(current_query.strip().split()))
+            if image_url:
+                return image_url
 
         # If we get here, all queries failed
-        print(f"💔 All {len(search_queries_to_try)} search queries failed to find suitable images")
+        logger.info(f"💔 All {len(search_queries_to_try)} search queries failed to find suitable images")
         return None
             
     except Exception as e:
-        print(f"Error fetching product image: {e}")
+        logger.info(f"Error fetching product image: {e}")
         return None
 
 def check_new_videos():
@@ -731,34 +772,40 @@ def check_new_videos():
     - Fetch latest videos from database
     - Compare and add new long-form videos
     """
-    print("\n=== CHECKING FOR NEW VIDEOS ===")
+    logger.info("\n=== CHECKING FOR NEW VIDEOS ===")
 
     try:
-        # Get channel ID (assuming we know it or fetch it)
-        from fetch_videos import get_channel_id, parse_duration_to_seconds
-        channel_id = get_channel_id(config.CHANNEL_HANDLE)
+        # Get channel ID (cached - only hits the API on the very first run)
+        from fetch_videos import get_cached_channel_id, get_uploads_playlist_id, parse_duration_to_seconds
+        channel_id = get_cached_channel_id(config.CHANNEL_HANDLE)
 
         if not channel_id:
-            print("Failed to get channel ID")
+            logger.info("Failed to get channel ID")
             return
 
-        # Fetch latest videos from YouTube API (get more than 3 to account for shorts filtering)
-        youtube = build('youtube', 'v3', developerKey=config.YOUTUBE_API_KEY)
-        request = youtube.search().list(
-            part='snippet',
-            channelId=channel_id,
-            maxResults=10,  # Get more to account for shorts filtering
-            order='date',
-            type='video'
+        # Walk the channel's uploads playlist (cached ID) for the latest videos:
+        # playlistItems.list costs 1 quota unit vs 100 for search.list and
+        # returns items newest-first
+        uploads_playlist_id = get_uploads_playlist_id(channel_id)
+
+        if not uploads_playlist_id:
+            logger.info("Failed to get uploads playlist ID")
+            return
+
+        youtube = _youtube
+        request = youtube.playlistItems().list(
+            part='contentDetails',
+            playlistId=uploads_playlist_id,
+            maxResults=10  # Get more than 3 to account for shorts filtering
         )
         response = request.execute()
 
-        # Collect video IDs and search results
+        # Collect video IDs and candidate results
         video_ids = []
         search_results = []
         for item in response['items']:
-            video_id = item['id']['videoId']
-            published_at = item['snippet']['publishedAt']
+            video_id = item['contentDetails']['videoId']
+            published_at = item['contentDetails'].get('videoPublishedAt')
             video_ids.append(video_id)
             search_results.append({
                 'video_id': video_id,
@@ -767,6 +814,21 @@ def check_new_videos():
                 'published_at': published_at
             })
 
+        # One targeted IN query tells us which candidates are already stored,
+        # wherever they sit in the table (a top-N window would misflag
+        # backfilled or re-dated uploads as new), and leaves only the genuinely
+        # unknown IDs to pay for a videos.list duration fetch
+        if video_ids:
+            def select_existing():
+                return config.supabase.table('videos').select('video_id').in_(
+                    'video_id', video_ids
+                ).execute()
+
+            existing_ids = {r['video_id'] for r in retry_supabase_operation(select_existing).data or []}
+            if existing_ids:
+                video_ids = [vid for vid in video_ids if vid not in existing_ids]
+                search_results = [s for s in search_results if s['video_id'] not in existing_ids]
+
         # Get duration details for videos
         youtube_videos = []
         if video_ids:
@@ -780,7 +842,15 @@ def check_new_videos():
             video_durations = {}
             for video_detail in video_details_response['items']:
                 duration_iso = video_detail['contentDetails']['duration']
-                duration_seconds = parse_duration_to_seconds(duration_iso)
+                if 'H' not in duration_iso and 'M' not in duration_iso:
+                    # Fast path: no hours or minutes means at most 59 seconds
+                    # (a short), so read the seconds digits directly
+                    try:
+                        duration_seconds = int(duration_iso[2:-1] or 0)
+                    except ValueError:
+                        duration_seconds = parse_duration_to_seconds(duration_iso)
+                else:
+                    duration_seconds = parse_duration_to_seconds(duration_iso)
                 video_durations[video_detail['id']] = duration_seconds
 
             # Filter out shorts (videos <= 160 seconds)
@@ -791,43 +861,41 @@ def check_new_videos():
                 if duration > 160:
                     youtube_videos.append(search_result)
                 else:
-                    print(f"Skipped short video: {search_result['video_url']} (duration: {duration}s)")
+                    logger.info(f"Skipped short video: {search_result['video_url']} (duration: {duration}s)")
+
+        # Upsert the latest 3 long-form videos in one call and let Postgres
+        # dedupe: ignore_duplicates leaves already-known rows untouched, so no
+        # separate read query or per-video insert is needed (requires the
+        # UNIQUE constraint on videos.video_id, see supabase_functions.sql)
+        rows = [{
+            'video_id': v['video_id'],
+            'video_url': v['video_url'],
+            'channel_id': v['channel_id'],
+            'published_at': v['published_at'],
+            'status': 'pending'
+        } for v in youtube_videos[:3]]  # Only consider the latest 3 long-form videos
+
+        if not rows:
+            logger.info("No new videos found")
+            return
 
-        # Fetch latest videos from database
-        db_result = config.supabase.table('videos').select('*').order('published_at', desc=True).limit(3).execute()
-        db_videos = db_result.data
+        def upsert_videos():
+            return config.supabase.table('videos').upsert(
+                rows, on_conflict='video_id', ignore_duplicates=True
+            ).execute()
 
-        # Compare videos
-        db_video_ids = {v['video_id'] for v in db_videos}
+        result = retry_supabase_operation(upsert_videos)
 
-        # Find new videos (limit to top 3 long-form videos)
-        new_videos = []
-        for yt_video in youtube_videos[:3]:  # Only consider the latest 3 long-form videos
-            if yt_video['video_id'] not in db_video_ids:
-                new_videos.append(yt_video)
-        
-        # Add new videos to database
-        if new_videos:
-            print(f"Found {len(new_videos)} new video(s)")
-            for video in new_videos:
-                try:
-                    def insert_video():
-                        return config.supabase.table('videos').insert({
-                        'video_id': video['video_id'],
-                        'video_url': video['video_url'],
-                        'channel_id': video['channel_id'],
-                        'published_at': video['published_at'],
-                        'status': 'pending'
-                    }).execute()
-                    retry_supabase_operation(insert_video)
-                    print(f"Added new video: {video['video_url']}")
-                except Exception as e:
-                    print(f"Error adding video {video['video_url']}: {e}")
+        new_rows = result.data or []
+        if new_rows:
+            logger.info(f"Found {len(new_rows)} new video(s)")
+            for row in new_rows:
+                logger.info(f"Added new video: {row['video_url']}")
         else:
-            print("No new videos found")
+            logger.info("No new videos found")
             
     except Exception as e:
-        print(f"Error checking for new videos: {e}")
+        logger.info(f"Error checking for new videos: {e}")
 
 def main():
     """
@@ -836,9 +904,9 @@ def main():
     1. Process one pending video
     2. Check for new videos
     """
-    print(f"\n{'='*50}")
-    print(f"CRON JOB STARTED - {datetime.now()}")
-    print(f"{'='*50}")
+    logger.info(f"\n{'='*50}")
+    logger.info(f"CRON JOB STARTED - {datetime.now()}")
+    logger.info(f"{'='*50}")
 
     # Display current Gemini usage
     current_usage = get_gemini_usage_count()
@@ -847,17 +915,20 @@ def main():
         emoji = "⚠️"
     elif current_usage >= 15:
         emoji = "🟡"
-    print(f"{emoji} CURRENT GEMINI USAGE: {current_usage}/20 {emoji}")
-    
-    # Part 1: Process pending videos
-    process_pending_video()
-    
-    # Part 2: Check for new videos
-    check_new_videos()
+    logger.info(f"{emoji} CURRENT GEMINI USAGE: {current_usage}/20 {emoji}")
     
-    print(f"\n{'='*50}")
-    print(f"CRON JOB COMPLETED - {datetime.now()}")
-    print(f"{'='*50}\n")
+    # Part 1 (process pending videos) and Part 2 (check for new videos) are
+    # independent and both network-bound, so run them in parallel - the cron
+    # tick takes as long as the slower phase instead of the sum of both
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        pending_future = executor.submit(process_pending_video)
+        new_videos_future = executor.submit(check_new_videos)
+        pending_future.result()
+        new_videos_future.result()
+
+    logger.info(f"\n{'='*50}")
+    logger.info(f"CRON JOB COMPLETED - {datetime.now()}")
+    logger.info(f"{'='*50}\n")
 
 if __name__ == "__main__":
     main()
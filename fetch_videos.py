@@ -1,190 +1,330 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from googleapiclient.discovery import build
 from datetime import datetime
 import config
-import re
+import json
+import logging
+import os
+
+# Per-video included/skipped/stored lines are DEBUG so a full backfill isn't
+# serialized behind thousands of stdout writes; page summaries stay at INFO
+logger = logging.getLogger(__name__)
+
+# Local cache for the handle -> channel ID mapping; the mapping never changes,
+# so resolving it once saves a YouTube API call (and quota) on every cron run
+CHANNEL_CACHE_FILE = '.channel_cache.json'
+
+# Shared YouTube service for all main-thread calls: build() parses the
+# discovery document and sets up an httplib2.Http every time, so construct it
+# once at import and let sequential calls reuse its keep-alive connection
+# (threads must build their own - httplib2.Http is not thread-safe)
+_youtube = build('youtube', 'v3', developerKey=config.YOUTUBE_API_KEY, static_discovery=True)
 
 def parse_duration_to_seconds(duration):
     """
     Parse ISO 8601 duration format (PT#H#M#S) to seconds
     Example: PT4M13S -> 253 seconds
-    """
-    # Pattern matches: PT (hours)H (minutes)M (seconds)S
-    pattern = r'PT(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?'
-    match = re.match(pattern, duration)
 
-    if not match:
+    Hand-rolled scanner: accumulate digits and dispatch on H/M/S. This runs
+    once per video in the pagination loop, and skipping the regex engine
+    (match setup, group allocation, int() per group) makes it several times
+    faster on these tiny strings.
+    """
+    if not duration.startswith('PT'):
         return 0
 
-    hours = int(match.group(1) or 0)
-    minutes = int(match.group(2) or 0)
-    seconds = int(match.group(3) or 0)
-
-    total_seconds = hours * 3600 + minutes * 60 + seconds
-    return total_seconds
+    total = 0
+    num = 0
+    for c in duration[2:]:
+        if '0' <= c <= '9':
+            num = num * 10 + (ord(c) - 48)
+        elif c == 'H':
+            total += num * 3600
+            num = 0
+        elif c == 'M':
+            total += num * 60
+            num = 0
+        elif c == 'S':
+            total += num
+            num = 0
+    return total
 
 def get_channel_id(channel_handle):
     """
-    Convert channel handle (e.g., @Trustified-Certification) to channel ID
+    Convert channel handle (e.g., @Trustified-Certification) to channel ID.
+    channels.list with forHandle is an exact lookup costing 1 quota unit,
+    vs 100 for the old search.list text query.
     """
-    youtube = build('youtube', 'v3', developerKey=config.YOUTUBE_API_KEY)
-    
+    youtube = _youtube
+
     # Remove @ if present
     handle = channel_handle.lstrip('@')
-    
+
     try:
-        request = youtube.search().list(
-            part='snippet',
-            q=handle,
-            type='channel',
-            maxResults=1
-        )
+        request = youtube.channels().list(part='id', forHandle=handle)
         response = request.execute()
-        
-        if response['items']:
-            channel_id = response['items'][0]['snippet']['channelId']
-            print(f"Found channel ID: {channel_id}")
+
+        if response.get('items'):
+            channel_id = response['items'][0]['id']
+            logger.info(f"Found channel ID: {channel_id}")
             return channel_id
         else:
-            print(f"No channel found for handle: {channel_handle}")
+            logger.info(f"No channel found for handle: {channel_handle}")
             return None
     except Exception as e:
-        print(f"Error getting channel ID: {e}")
+        logger.error(f"Error getting channel ID: {e}")
         if "API key expired" in str(e):
-            print("YouTube API key has expired. Please renew it in Google Cloud Console.")
+            logger.error("YouTube API key has expired. Please renew it in Google Cloud Console.")
         elif "badRequest" in str(e):
-            print("YouTube API request is malformed. Check API key and permissions.")
+            logger.error("YouTube API request is malformed. Check API key and permissions.")
         elif "quotaExceeded" in str(e):
-            print("YouTube API quota exceeded. Check usage limits.")
+            logger.error("YouTube API quota exceeded. Check usage limits.")
+        return None
+
+@lru_cache(maxsize=4)
+def get_cached_channel_id(channel_handle):
+    """
+    Resolve a channel handle to its channel ID, avoiding the API call when possible:
+    1. In-process memo (lru_cache) for repeat calls within one run
+    2. YOUTUBE_CHANNEL_ID from .env (if set)
+    3. Local cache file from a previous run
+    4. YouTube API lookup (result is cached for next time)
+    """
+    if config.YOUTUBE_CHANNEL_ID:
+        return config.YOUTUBE_CHANNEL_ID
+
+    cache = {}
+    try:
+        with open(CHANNEL_CACHE_FILE, 'r') as f:
+            cache = json.load(f)
+        if channel_handle in cache:
+            return cache[channel_handle]
+    except (FileNotFoundError, ValueError):
+        pass
+
+    channel_id = get_channel_id(channel_handle)
+
+    if channel_id:
+        try:
+            cache[channel_handle] = channel_id
+            with open(CHANNEL_CACHE_FILE, 'w') as f:
+                json.dump(cache, f)
+        except Exception as e:
+            logger.error(f"Error writing channel cache: {e}")
+
+    return channel_id
+
+def get_uploads_playlist_id(channel_id):
+    """
+    Resolve a channel ID to its 'uploads' playlist ID, cached in the same local
+    file as the channel ID (the mapping is fixed for a given channel).
+    Walking that playlist costs 1 quota unit per page vs 100 for search.list.
+    """
+    cache_key = f"uploads:{channel_id}"
+    cache = {}
+    try:
+        with open(CHANNEL_CACHE_FILE, 'r') as f:
+            cache = json.load(f)
+        if cache_key in cache:
+            return cache[cache_key]
+    except (FileNotFoundError, ValueError):
+        pass
+
+    youtube = _youtube
+
+    try:
+        request = youtube.channels().list(part='contentDetails', id=channel_id)
+        response = request.execute()
+
+        if not response['items']:
+            logger.info(f"No channel found for ID: {channel_id}")
+            return None
+
+        uploads_id = response['items'][0]['contentDetails']['relatedPlaylists']['uploads']
+
+        try:
+            cache[cache_key] = uploads_id
+            with open(CHANNEL_CACHE_FILE, 'w') as f:
+                json.dump(cache, f)
+        except Exception as e:
+            logger.error(f"Error writing channel cache: {e}")
+
+        return uploads_id
+    except Exception as e:
+        logger.error(f"Error getting uploads playlist ID: {e}")
         return None
 
 def fetch_all_videos(channel_id):
     """
     Fetch all videos from the YouTube channel, filtering out shorts (<= 60 seconds)
-    Returns list of video dictionaries with video_id, video_url, channel_id, and published_at
+    Yields one list of video dictionaries (video_id, video_url, channel_id,
+    published_at) per playlist page, so the caller can store a page while the
+    next one is still being fetched.
+
+    While one page's videos.list duration fetch and filtering run, the next
+    playlist page is already being pulled on a prefetch thread, overlapping
+    the two independent round-trips per page.
     """
-    youtube = build('youtube', 'v3', developerKey=config.YOUTUBE_API_KEY)
-    videos = []
-    next_page_token = None
+    youtube = _youtube
+    # httplib2.Http is not thread-safe, so the prefetch thread gets its own
+    # service object rather than sharing the main one
+    prefetch_youtube = build('youtube', 'v3', developerKey=config.YOUTUBE_API_KEY, static_discovery=True)
+    total_kept = 0
+
+    # Walk the channel's uploads playlist (ID cached on disk) instead of
+    # search.list: playlistItems.list costs 1 quota unit per page vs 100,
+    # returns uploads newest-first, and already carries videoPublishedAt
+    uploads_id = get_uploads_playlist_id(channel_id)
+    if not uploads_id:
+        logger.error("Failed to get uploads playlist ID")
+        return
+
+    def fetch_page(service, page_token):
+        return service.playlistItems().list(
+            part='contentDetails',
+            playlistId=uploads_id,
+            maxResults=50,
+            pageToken=page_token
+        ).execute()
 
+    # One SELECT of the stored video_ids lets us skip the videos.list duration
+    # fetch for anything seen on a previous run - and since uploads come back
+    # newest-first, a page of all-known IDs means every older page is known
+    # too, so pagination can stop there
+    existing = set()
     try:
-        while True:
-            request = youtube.search().list(
-                part='snippet',
-                channelId=channel_id,
-                maxResults=50,
-                order='date',
-                type='video',
-                pageToken=next_page_token
-            )
-            response = request.execute()
-
-            # Collect video IDs from search results
-            video_ids = []
-            search_results = []
-
-            for item in response['items']:
-                video_id = item['id']['videoId']
-                published_at = item['snippet']['publishedAt']
-                video_ids.append(video_id)
-                search_results.append({
-                    'video_id': video_id,
-                    'video_url': f"https://www.youtube.com/watch?v={video_id}",
-                    'channel_id': channel_id,
-                    'published_at': published_at
-                })
-
-            # Get duration details for all videos in this batch
-            if video_ids:
-                # YouTube API limits to 50 video IDs per request
-                video_details_request = youtube.videos().list(
-                    part='contentDetails',
-                    id=','.join(video_ids[:50])  # Limit to 50 as per API limits
-                )
-                video_details_response = video_details_request.execute()
-
-                # Create mapping of video_id to duration
-                video_durations = {}
-                for video_detail in video_details_response['items']:
-                    duration_iso = video_detail['contentDetails']['duration']
-                    duration_seconds = parse_duration_to_seconds(duration_iso)
-                    video_durations[video_detail['id']] = duration_seconds
-
-                # Filter out shorts (videos <= 160 seconds) and add to results
-                for search_result in search_results:
-                    video_id = search_result['video_id']
-                    duration = video_durations.get(video_id, 0)
-
-                    if duration > 160:
-                        videos.append(search_result)
-                        print(f"Included video: {search_result['video_url']} (duration: {duration}s)")
-                    else:
-                        print(f"Skipped short: {search_result['video_url']} (duration: {duration}s)")
-
-            next_page_token = response.get('nextPageToken')
-
-            if not next_page_token:
-                break
-
-            print(f"Fetched {len(videos)} long-form videos so far...")
-
-        print(f"Total long-form videos fetched: {len(videos)}")
-        return videos
+        result = config.supabase.table('videos').select('video_id').execute()
+        existing = {r['video_id'] for r in result.data or []}
+        logger.info(f"Loaded {len(existing)} already-stored video ID(s)")
+    except Exception as e:
+        logger.error(f"Error loading existing video IDs: {e}")
+
+    try:
+        with ThreadPoolExecutor(max_workers=1) as prefetch:
+            response = fetch_page(youtube, None)
+
+            while True:
+                # Kick off the next search page before touching this one
+                next_page_token = response.get('nextPageToken')
+                next_page = None
+                if next_page_token:
+                    next_page = prefetch.submit(fetch_page, prefetch_youtube, next_page_token)
+
+                # Collect video IDs from playlist items, skipping known ones
+                video_ids = []
+                published_by_id = {}
+                for item in response['items']:
+                    video_id = item['contentDetails']['videoId']
+                    if video_id in existing:
+                        continue
+                    video_ids.append(video_id)
+                    published_by_id[video_id] = item['contentDetails'].get('videoPublishedAt')
+
+                # Get duration details for all videos in this batch
+                page_videos = []
+                if video_ids:
+                    # YouTube API limits to 50 video IDs per request
+                    video_details_request = youtube.videos().list(
+                        part='contentDetails',
+                        id=','.join(video_ids[:50])  # Limit to 50 as per API limits
+                    )
+                    video_details_response = video_details_request.execute()
+
+                    # Filter out shorts (videos <= 160 seconds) and add to results
+                    for video_detail in video_details_response['items']:
+                        duration_iso = video_detail['contentDetails']['duration']
+                        duration = parse_duration_to_seconds(duration_iso)
+                        video_url = f"https://www.youtube.com/watch?v={video_detail['id']}"
+
+                        if duration > 160:
+                            # Rows are built in insert shape so store_videos
+                            # can send them to Supabase without rebuilding
+                            page_videos.append({
+                                'video_id': video_detail['id'],
+                                'video_url': video_url,
+                                'channel_id': channel_id,
+                                'published_at': published_by_id[video_detail['id']],
+                                'status': 'pending'
+                            })
+                            logger.debug("Included video: %s (duration: %ds)", video_url, duration)
+                        else:
+                            logger.debug("Skipped short: %s (duration: %ds)", video_url, duration)
+
+                if video_ids:
+                    logger.info(f"Page done: kept {len(page_videos)}, skipped {len(video_ids) - len(page_videos)}")
+
+                if page_videos:
+                    total_kept += len(page_videos)
+                    yield page_videos
+
+                if response['items'] and not video_ids:
+                    # Whole page already stored; everything older is too
+                    logger.info("Reached already-stored videos, stopping pagination")
+                    break
+
+                if next_page is None:
+                    break
+
+                logger.info(f"Fetched {total_kept} long-form videos so far...")
+                response = next_page.result()
+
+        logger.info(f"Total long-form videos fetched: {total_kept}")
 
     except Exception as e:
-        print(f"Error fetching videos: {e}")
-        return videos
+        logger.error(f"Error fetching videos: {e}")
 
 def store_videos(videos):
     """
-    Insert videos into Supabase with status='pending'
+    Insert videos into Supabase with status='pending', in bulk.
+    Duplicates are dropped server-side by ON CONFLICT DO NOTHING, so there is
+    no per-row round-trip or exception handling (requires the UNIQUE
+    constraint on videos.video_id, see supabase_functions.sql).
     """
     if not videos:
-        print("No videos to store")
+        logger.info("No videos to store")
         return
-    
+
     try:
-        # Insert videos, ignoring duplicates
-        for video in videos:
-            try:
-                result = config.supabase.table('videos').insert({
-                    'video_id': video['video_id'],
-                    'video_url': video['video_url'],
-                    'channel_id': video['channel_id'],
-                    'published_at': video['published_at'],
-                    'status': 'pending'
-                }).execute()
-                print(f"Stored video: {video['video_url']}")
-            except Exception as e:
-                # Skip if video already exists (unique constraint violation)
-                if 'duplicate' in str(e).lower() or 'unique' in str(e).lower():
-                    print(f"Video already exists: {video['video_url']}")
-                else:
-                    print(f"Error storing video {video['video_url']}: {e}")
-        
-        print(f"Finished storing videos")
-        
+        # Rows arrive from fetch_all_videos already in insert shape.
+        # 500 rows per request keeps each payload modest; batching gains
+        # plateau well before that anyway
+        for i in range(0, len(videos), 500):
+            chunk = videos[i:i + 500]
+            # returning='minimal' skips serializing rows we never read
+            config.supabase.table('videos').upsert(
+                chunk, on_conflict='video_id', ignore_duplicates=True,
+                returning='minimal'
+            ).execute()
+            logger.info(f"Stored batch of {len(chunk)} video(s)")
+
+        logger.info(f"Finished storing {len(videos)} video(s)")
+
     except Exception as e:
-        print(f"Error storing videos: {e}")
+        logger.error(f"Error storing videos: {e}")
 
 def main():
     """
     Main execution: Fetch and store all videos from the channel
     """
-    print(f"Starting video fetch for channel: {config.CHANNEL_HANDLE}")
+    logging.basicConfig(level=os.environ.get('LOGLEVEL', 'INFO'), format='%(message)s')
+    logger.info(f"Starting video fetch for channel: {config.CHANNEL_HANDLE}")
     
     # Get channel ID
-    channel_id = get_channel_id(config.CHANNEL_HANDLE)
+    channel_id = get_cached_channel_id(config.CHANNEL_HANDLE)
     if not channel_id:
-        print("Failed to get channel ID. Exiting.")
+        logger.error("Failed to get channel ID. Exiting.")
         return
     
-    # Fetch all videos
-    videos = fetch_all_videos(channel_id)
-    
-    # Store videos in Supabase
-    store_videos(videos)
-    
-    print("Video fetch completed!")
+    # Store each page as it arrives, overlapping the Supabase write with the
+    # fetch of the next YouTube page instead of draining pagination first
+    with ThreadPoolExecutor(max_workers=1) as store_pool:
+        pending = [store_pool.submit(store_videos, page_videos)
+                   for page_videos in fetch_all_videos(channel_id)]
+        for future in pending:
+            future.result()
+
+    logger.info("Video fetch completed!")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,55 @@
+-- SQL functions used by the cron job.
+-- Run these in the Supabase SQL editor once before deploying.
+
+-- Needed so check_new_videos can upsert with on_conflict='video_id' and let
+-- Postgres drop duplicates server-side.
+ALTER TABLE videos ADD CONSTRAINT videos_video_id_key UNIQUE (video_id);
+
+-- Partial index matching the inner SELECT of claim_next_pending_video, so
+-- finding the newest pending video is an index scan instead of a sequential
+-- scan + sort as the table grows.
+CREATE INDEX IF NOT EXISTS idx_videos_pending_published_at
+    ON videos (published_at DESC)
+    WHERE status = 'pending';
+
+-- Atomically claims the newest pending video: picks it, marks it 'updating'
+-- and bumps the retry bookkeeping in a single transaction. FOR UPDATE SKIP
+-- LOCKED makes this safe when two cron runs overlap - they can never claim
+-- the same video.
+-- Writes all report rows for a video and flips the video to 'completed' in a
+-- single transaction, so the cron job pays one round-trip instead of a
+-- reports upsert plus a separate videos update. Adjust the bigint casts if
+-- your videos.id column is uuid.
+CREATE OR REPLACE FUNCTION finalize_video(p_video_id bigint, p_rows jsonb)
+RETURNS void AS $$
+BEGIN
+    INSERT INTO reports (id, results, image_url, image_status, video_url, product_id,
+                         product_name, product_category, verdict, company, video_id, price)
+    SELECT r->>'id', r->'results', r->>'image_url', r->>'image_status', r->>'video_url',
+           r->>'product_id', r->>'product_name', r->>'product_category', r->>'verdict',
+           r->>'company', (r->>'video_id')::bigint, (r->>'price')::int
+    FROM jsonb_array_elements(p_rows) AS r
+    ON CONFLICT (id) DO UPDATE SET
+        results = EXCLUDED.results,
+        image_url = EXCLUDED.image_url,
+        image_status = EXCLUDED.image_status;
+
+    UPDATE videos SET status = 'completed' WHERE id = p_video_id;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION claim_next_pending_video()
+RETURNS SETOF videos AS $$
+    UPDATE videos
+    SET status = 'updating',
+        last_attempt_at = now(),
+        retry_count = retry_count + 1
+    WHERE id = (
+        SELECT id FROM videos
+        WHERE status = 'pending'
+        ORDER BY published_at DESC
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING *;
+$$ LANGUAGE sql;